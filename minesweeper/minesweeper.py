@@ -1,5 +1,73 @@
-import itertools
+import math
 import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Seconds make_random_move may spend counting mine layouts
+GUESS_TIME_BUDGET = 1.0
+
+# What MinesweeperAI knows about each cell
+UNKNOWN = 0
+SAFE = 1
+MOVED = 2
+MINE = 3
+
+# Count of a cell not yet revealed
+NO_COUNT = 255
+
+
+class Grid():
+    """
+    Cells of a height x width board, numbered row by row: cell (i, j)
+    has index i * width + j.
+    """
+
+    def __init__(self, height, width):
+        if height < 1 or width < 1:
+            raise ValueError(f"Invalid board: {height} x {width}")
+        self.height = height
+        self.width = width
+        self.size = height * width
+
+        # Offsets to the neighbours of a cell, by which of the cells
+        # above, below, left and right of it are on the board
+        self.offsets = []
+        for sides in range(16):
+            offsets = []
+            for di in (-1, 0, 1):
+                for dj in (-1, 0, 1):
+                    if (di, dj) == (0, 0):
+                        continue
+                    if (di == -1 and not sides & 1
+                            or di == 1 and not sides & 2
+                            or dj == -1 and not sides & 4
+                            or dj == 1 and not sides & 8):
+                        continue
+                    offsets.append(di * width + dj)
+            self.offsets.append(tuple(offsets))
+
+    def index(self, cell):
+        i, j = cell
+        return i * self.width + j
+
+    def cell(self, index):
+        return divmod(index, self.width)
+
+    def neighbours(self, index):
+        """
+        Returns the indices of the cells around a cell.
+        """
+        i, j = divmod(index, self.width)
+        sides = ((i > 0) | (i < self.height - 1) << 1
+                 | (j > 0) << 2 | (j < self.width - 1) << 3)
+        return [index + offset for offset in self.offsets[sides]]
+
+    def corners(self):
+        """
+        Returns the indices of the corner cells.
+        """
+        return sorted({0, self.width - 1, self.size - self.width, self.size - 1})
 
 
 class Minesweeper():
@@ -12,28 +80,47 @@ class Minesweeper():
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
-
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
-
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            CORNERS =[(0,0),(0,7),(7,0),(7,7)]
-            if not self.board[i][j] and (i,j) not in CORNERS:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        self.grid = Grid(height, width)
+
+        # Initialize an empty field with no mines: one byte per cell,
+        # 1 where there is a mine
+        self.board = bytearray(self.grid.size)
+
+        # Add mines randomly, keeping the corners clear
+        corners = self.grid.corners()
+        if not 0 <= mines <= self.grid.size - len(corners):
+            raise ValueError(f"Cannot place {mines} mines on {height} x {width}")
+        for index in random.sample(range(self.grid.size - len(corners)), mines):
+            for corner in corners:
+                if index >= corner:
+                    index += 1
+            self.board[index] = 1
+
+        # Count the mines around every cell once, by adding each mine
+        # to its neighbours, so the cost follows the number of mines
+        self.counts = bytearray(self.grid.size)
+        counts = self.counts
+        for index in _ones(self.board):
+            for n in self.grid.neighbours(index):
+                counts[n] += 1
+        self._rows = [
+            memoryview(counts)[i * width:(i + 1) * width].toreadonly()
+            for i in range(height)
+        ]
+
+        # Cells revealed so far, 1 where revealed
+        self.revealed = bytearray(self.grid.size)
 
         # At first, player has found no mines
         self.mines_found = set()
 
+    @property
+    def mines(self):
+        """
+        The set of cells that are mines.
+        """
+        return {self.grid.cell(index) for index in _ones(self.board)}
+
     def print(self):
         """
         Prints a text-based representation
@@ -42,7 +129,7 @@ class Minesweeper():
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                if self.board[i][j]:
+                if self.board[i * self.width + j]:
                     print("|X", end="")
                 else:
                     print("| ", end="")
@@ -50,8 +137,7 @@ class Minesweeper():
         print("--" * self.width + "-")
 
     def is_mine(self, cell):
-        i, j = cell
-        return self.board[i][j]
+        return self.board[self.grid.index(cell)] == 1
 
     def nearby_mines(self, cell):
         """
@@ -59,24 +145,43 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
+        return self.counts[self.grid.index(cell)]
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
+    def reveal(self, cell):
+        """
+        Reveals a cell that is not a mine. If no mines are near it, the
+        cells around it are revealed too, and so on for every revealed
+        cell with no mines near it, in one breadth-first pass.
 
-        return count
+        Returns the newly revealed cells, as (cell, nearby mines) pairs
+        in the order they were revealed.
+        """
+        grid = self.grid
+        index = grid.index(cell)
+        if self.board[index]:
+            raise ValueError(f"Cell is a mine: {cell}")
+        revealed = self.revealed
+        counts = self.counts
+        if revealed[index]:
+            return []
+        revealed[index] = 1
+        cells = [(cell, counts[index])]
+        queue = deque([index] if counts[index] == 0 else [])
+        while queue:
+            for n in grid.neighbours(queue.popleft()):
+                if not revealed[n]:
+                    revealed[n] = 1
+                    cells.append((grid.cell(n), counts[n]))
+                    if counts[n] == 0:
+                        queue.append(n)
+        return cells
+
+    def nearby_mines_grid(self):
+        """
+        Returns the number of nearby mines of every cell, as a list of
+        read-only rows indexed like the board.
+        """
+        return self._rows
 
     def won(self):
         """
@@ -106,37 +211,33 @@ class Sentence():
         """
         Returns the set of all cells in self.cells known to be mines.
         """
-        arr = set()
-        for i in self.cells:
-            if i == True:
-                arr.add(i)
-        return arr
+        if self.count and len(self.cells) == self.count:
+            return set(self.cells)
+        return set()
 
     def known_safes(self):
         """
         Returns the set of all cells in self.cells known to be safe.
         """
-        arr = set()
-        for i in self.cells:
-            if i == False:
-                arr.add(i)
-        return arr
+        if self.count == 0:
+            return set(self.cells)
+        return set()
 
     def mark_mine(self, cell):
         """
         Updates internal knowledge representation given the fact that
         a cell is known to be a mine.
         """
-        i,j = cell
-        self.cells[i][j] = True
+        if cell in self.cells:
+            self.cells.remove(cell)
+            self.count -= 1
 
     def mark_safe(self, cell):
         """
         Updates internal knowledge representation given the fact that
         a cell is known to be safe.
         """
-        i,j = cell
-        self.cells[i][j] = False
+        self.cells.discard(cell)
 
 
 class MinesweeperAI():
@@ -144,228 +245,571 @@ class MinesweeperAI():
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=8, workers=None,
+                 time_budget=GUESS_TIME_BUDGET):
 
-        # Set initial height and width
+        # Set initial height and width, and the number of mines
         self.height = height
         self.width = width
+        self.grid = Grid(height, width)
+        self.total_mines = mines
+
+        # Guessing counts mine layouts on this many processes, if set,
+        # for at most time_budget seconds per guess
+        self.workers = workers
+        self.time_budget = time_budget
+        self._layouts = {}
+
+        # What is known about each cell, by index: UNKNOWN, SAFE, MOVED
+        # (clicked on) or MINE, and the count revealed at each cell
+        # clicked on
+        self.state = bytearray(self.grid.size)
+        self.counts = bytearray([NO_COUNT]) * self.grid.size
+        self.unknown = self.grid.size
+        self.mine_total = 0
+
+        # Safe cells not yet clicked on, most recently found last
+        self.safe_moves = []
+
+        # Sentences about the unknown cells known to be true, keyed by
+        # their cells, and the keys of the sentences each cell is in
+        self.sentences = {}
+        self.constraints = {}
+
+    @property
+    def moves_made(self):
+        """
+        The set of cells that have been clicked on.
+        """
+        return self._cells(MOVED)
+
+    @property
+    def mines(self):
+        """
+        The set of cells known to be mines.
+        """
+        return self._cells(MINE)
+
+    @property
+    def safes(self):
+        """
+        The set of cells known to be safe, clicked on or not.
+        """
+        return self._cells(SAFE) | self._cells(MOVED)
+
+    @property
+    def knowledge(self):
+        """
+        The count revealed at each cell clicked on.
+        """
+        return {
+            self.grid.cell(index): self.counts[index]
+            for index in _ones(self.state, MOVED)
+        }
+
+    def _cells(self, state):
+        return {self.grid.cell(index) for index in _ones(self.state, state)}
 
-        # Keep track of which cells have been clicked on
-        self.moves_made = set()
-
-        # Keep track of cells known to be safe or mines
-        self.mines = set()
-        self.safes = set()
-
-        # List of sentences about the game known to be true
-        self.knowledge = {}
-
-        # Stuff to use
-        self.forcedMoves = set()
-        self.nextMove = []
-        self.depth = 0
-
-        self.map = set()
-        for i in range(height):
-            for j in range(height):
-                self.map.add((i,j))
-    
-    def neighboursthatarentflaggedoramove(self,cell):
-        arr = self.neighbours(cell)
-        n = 0
-        for i in arr:
-            if i not in self.moves_made and i in self.mines:
-                print('')
-
-    # All neighbours that are hidden and not a mine
-    def hiddenneighboursNotMine(self,cell):
-        n = 0
-        arr = self.neighbours(cell)
-        for i in arr:
-            if i not in self.moves_made and i not in self.mines:
-                n += 1
-        return n
-
-    # All neighbours that are hidden
-    def hiddenneighbours(self,cell):
-        n = 0
-        arr = self.neighbours(cell)
-        for i in arr:
-            if i not in self.moves_made:
-                n += 1
-        if n != 0:
-            return n
-        return -1
-
-    # All neighbours
     def neighbours(self, cell):
         """Returns a list of neighbouring cells for some cell."""
-        arr = []
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-                if (i, j) == cell:
-                    continue
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    arr.append((i,j))
-        return arr
-    
-    # All neighbours that are bombs
-    def flaggedneighbours(self,cell):
-        """Returns how many neighbouring cells are flagged as a mine."""
-        closeMines = 0
-        arr = self.neighbours(cell)
-        for i in arr:
-            if i in self.mines:
-                closeMines += 1
-        return closeMines
-    
-
-    def mineProbe(self,tile,depth):
-        """Looks for a new safe tile among the neighbouring cells of a specific cell."""
-        if depth > 3:
-            return
-        neighbours = self.neighbours(tile)
-        for cell in neighbours:
-            if cell in self.knowledge:
-                count = self.knowledge[cell]
-                closeFlags = self.flaggedneighbours(cell)
-                if count == closeFlags:
-                    for i in self.neighbours(cell):
-                        if i not in self.mines:
-                            self.mark_safe(i)
-        depth += 1
-        self.mineProbe(cell,depth)
-    
-    def tileProbe(self,depth):
-        """Looks for safe tiles among the neighbouring cells of found mines."""
-        if depth > 3:
-            return
-        temporaryMines = set()
-        for temp in self.mines:
-            temporaryMines.add(temp)
-
-        for cell in temporaryMines:
-            neighbours = self.neighbours(cell)
-            for i in neighbours:
-                if i in self.knowledge:
-                    count = self.knowledge[i]
-                    closeFlags = self.flaggedneighbours(i)
-                    if count == closeFlags:
-                        for j in self.neighbours(i):
-                            if j not in self.mines:
-                                self.mark_safe(i)
-        depth += 1
-        self.tileProbe(depth)
-    
-
-    def generalProbe(self,depth):
-        """"""
-        if depth > 3:
-            return
-        for cell in self.moves_made:
-            count = self.knowledge[cell]
-            closeHiddens = self.hiddenneighbours(cell)
-            if count == closeHiddens:
-                for newCell in self.neighbours(cell):
-                    if newCell not in self.safes:
-                        self.mark_mine(newCell)
-                        self.mineProbe(newCell,0)
-        depth += 1
-        self.generalProbe(depth)
+        grid = self.grid
+        return [grid.cell(n) for n in grid.neighbours(grid.index(cell))]
 
     def mark_mine(self, cell):
-        self.mines.add(cell)
-        if cell in self.safes:
-            self.safes.remove(cell)
+        """
+        Marks a cell as a mine and draws every conclusion that follows.
+        """
+        queue = deque()
+        self._mark(self.grid.index(cell), MINE, queue)
+        self._propagate(queue)
 
     def mark_safe(self, cell):
-        self.safes.add(cell)
-        if cell in self.mines:
-            self.mines.remove(cell)
-
+        """
+        Marks a cell as safe and draws every conclusion that follows.
+        """
+        queue = deque()
+        self._mark(self.grid.index(cell), SAFE, queue)
+        self._propagate(queue)
 
     def add_knowledge(self, cell, count):
-        self.knowledge[cell] = count
-        self.moves_made.add(cell)
-        self.mark_safe(cell)
+        """
+        Records that cell is safe and has count mines around it, then
+        marks every cell this proves to be a mine or safe.
+        """
+        self.add_revealed([(cell, count)])
 
-        self.mineProbe(cell,0)
-        self.tileProbe(0)
-        self.generalProbe(0)
+    def add_revealed(self, revealed):
+        """
+        Records many revealed cells at once, such as those returned by
+        Minesweeper.reveal, as (cell, count) pairs, then marks every
+        cell they prove to be a mine or safe in one pass.
+        """
+        grid = self.grid
+        state = self.state
+        queue = deque()
+        indices = []
+        for cell, count in revealed:
+            index = grid.index(cell)
+            if state[index] == SAFE:
+                state[index] = MOVED
+            else:
+                self._mark(index, MOVED, queue)
+            self.counts[index] = count
+            indices.append(index)
+        for index in indices:
+            self._add_sentence(grid.neighbours(index), self.counts[index], queue)
+        self._propagate(queue)
+
+    def _add_sentence(self, cells, count, queue):
+        """
+        Adds the sentence that count of cells are mines, leaving out
+        cells already known, and queues it to be checked.
+        """
+        state = self.state
+        unknown = []
+        for c in cells:
+            if state[c] == UNKNOWN:
+                unknown.append(c)
+            elif state[c] == MINE:
+                count -= 1
+        if not unknown:
+            return
+        key = frozenset(unknown)
+        if key in self.sentences:
+            return
+        self.sentences[key] = Sentence(key, count)
+        for c in key:
+            self.constraints.setdefault(c, set()).add(key)
+        queue.append(key)
+
+    def _remove_sentence(self, key):
+        """
+        Removes a sentence and returns it.
+        """
+        for c in key:
+            keys = self.constraints[c]
+            keys.discard(key)
+            if not keys:
+                del self.constraints[c]
+        return self.sentences.pop(key)
+
+    def _mark(self, cell, state, queue):
+        """
+        Records an unknown cell, by index, as a MINE, SAFE or MOVED, and
+        rewrites the sentences about it without it.
+        """
+        if self.state[cell] != UNKNOWN:
+            return
+        self.unknown -= 1
+        self.state[cell] = state
+        if state == MINE:
+            self.mine_total += 1
+        elif state == SAFE:
+            self.safe_moves.append(cell)
+        for key in list(self.constraints.get(cell, ())):
+            sentence = self._remove_sentence(key)
+            if state == MINE:
+                sentence.mark_mine(cell)
+            else:
+                sentence.mark_safe(cell)
+            self._add_sentence(sentence.cells, sentence.count, queue)
+
+    def _propagate(self, queue):
+        """
+        Checks the queued sentences until nothing more can be inferred.
+
+        A sentence that is all mines or all safe marks its cells. A
+        sentence that is a subset of another is subtracted from it. Only
+        sentences that are new or have just changed are queued, and only
+        sentences sharing a cell with them are compared, so the work
+        done follows what a move changed rather than the whole board.
+        """
+        while queue:
+            key = queue.popleft()
+            sentence = self.sentences.get(key)
+            if sentence is None:
+                continue
+
+            mines = sentence.known_mines()
+            safes = sentence.known_safes()
+            if mines or safes:
+                for c in mines:
+                    self._mark(c, MINE, queue)
+                for c in safes:
+                    self._mark(c, SAFE, queue)
+                continue
+
+            overlapping = set()
+            for c in key:
+                overlapping |= self.constraints[c]
+            overlapping.discard(key)
+            for other in overlapping:
+                if other not in self.sentences or key not in self.sentences:
+                    continue
+                if key < other:
+                    # Replace the superset by what it says beyond key
+                    count = self._remove_sentence(other).count
+                    self._add_sentence(other - key, count - sentence.count, queue)
+                elif other < key:
+                    count = self.sentences[other].count
+                    self._remove_sentence(key)
+                    self._add_sentence(key - other, sentence.count - count, queue)
+                    break
 
     def make_safe_move(self):
-        # Force moves with 0's first. This isn't very efficient at all, but,
-        # It really bothered me that the 0 tiles weren't being done first, the same as normal mine sweeper.
-        for cell in self.moves_made:
-            if self.knowledge[cell] == 0:
-                for k in self.neighbours(cell):
-                    if k not in self.knowledge:
-                        return k
-        for cell in self.safes:
-            if cell not in self.moves_made:
-                return cell
+        """
+        Returns a cell known to be safe and not yet clicked on, or None.
+        The most recently found are returned first, so the cells around
+        a revealed 0 are opened before moving elsewhere.
+        """
+        while self.safe_moves:
+            index = self.safe_moves.pop()
+            if self.state[index] == SAFE:
+                return self.grid.cell(index)
+        return None
 
     def make_random_move(self):
-        # Genereate a board
-        board = []
-        for i in range(8):
-            for j in range(8):
-                board.append((i, j))
-
-        # Try a tile with no neighbours, it's the highest probability of being safe.
-        for i in board:
-            if i not in self.moves_made:
-                tempBool = True
-                for j in self.neighbours(i):
-                    if j in self.knowledge:
-                        tempBool = False
-                        break
-                if tempBool == True:
-                    return i
-
-        
-        move = None
-        best = -3
-
-        # Bomb probability:
-        # A played cell contains a count of how many mines are neighbouring it. The probability of there being a mine among its neighbouring cells
-        # is self.knowledge[cell] / (neighbouring cells not in self.moves_made + neighbouring cells not in self.mines)
-        # The acceptable limit here is 2.
-        for i in self.moves_made:
-            k = self.knowledge[i]
-            bombsNear = self.flaggedneighbours(i)
-            if (-1 * (k + bombsNear)) > best:
-                best = (-1 * (k + bombsNear))
-                tempNeighbours = self.neighbours(i)
-                for j in tempNeighbours:
-                    if j not in self.moves_made and j not in self.mines:
-                        move = j
-                        break
+        """
+        Returns the unknown cell least likely to be a mine, or None if
+        every unknown cell is a mine.
+
+        Cells whose chance of being a mine works out to exactly 0 or 1
+        are marked safe or mines on the way.
+        """
+        if not self.unknown:
+            return None
+        probabilities, certain, density, othersCertain = (
+            self._mine_probabilities()
+        )
+
+        queue = deque()
+        for index, state in certain.items():
+            self._mark(index, state, queue)
+        if othersCertain is not None:
+            for index in list(_ones(self.state, UNKNOWN)):
+                if index not in self.constraints:
+                    self._mark(index, othersCertain, queue)
+        self._propagate(queue)
+        move = self.make_safe_move()
         if move is not None:
             return move
+
+        # Break ties towards corners and edges, which open up more often
+        grid = self.grid
+        candidates = [
+            (probability, len(grid.neighbours(index)), index)
+            for index, probability in probabilities.items()
+            if self.state[index] == UNKNOWN
+        ]
+        other = self._unconstrained_cell()
+        if other is not None:
+            candidates.append((density, len(grid.neighbours(other)), other))
+        if not candidates:
+            return None
+        return grid.cell(min(candidates)[2])
+
+    def _unconstrained_cell(self):
+        """
+        Returns the index of an unknown cell no sentence mentions,
+        preferring corners, or None if there is none.
+        """
+        state = self.state
+        for corner in self.grid.corners():
+            if state[corner] == UNKNOWN and corner not in self.constraints:
+                return corner
+        for index in _ones(state, UNKNOWN):
+            if index not in self.constraints:
+                return index
+        return None
+
+    def mine_probabilities(self):
+        """
+        Returns the chance that each unknown cell is a mine, given
+        everything known and the total number of mines.
+        """
+        probabilities, _, density, _ = self._mine_probabilities()
+        return {
+            self.grid.cell(index): probabilities.get(index, density)
+            for index in _ones(self.state, UNKNOWN)
+        }
+
+    def _mine_probabilities(self):
+        """
+        Returns the chance that each cell in a sentence is a mine, by
+        index, and the chance for any other unknown cell. Each chance
+        comes with what is certain on exact layout counts, rather than
+        on the rounded chance: the cells in sentences known to be a
+        MINE or SAFE, and MINE, SAFE or None for every other cell.
+
+        The cells in sentences split into components that share no
+        sentence. Each component's mine layouts are counted separately,
+        in parallel if self.workers is set. Layouts are then weighted
+        by the number of ways to place the remaining mines on the cells
+        no sentence mentions. A component not counted within
+        self.time_budget seconds falls back to its sentences' densities.
+        """
+        components = self._components()
+        layouts = self._count_components(components)
+
+        remaining = self.total_mines - self.mine_total
+        probabilities = {}
+        counted = []
+        for (cells, sentences), result in zip(components, layouts):
+            if result is None:
+                for cell in cells:
+                    probabilities[cell] = max(
+                        count / len(sentenceCells)
+                        for sentenceCells, count in sentences
+                        if cell in sentenceCells
+                    )
+                remaining -= round(sum(probabilities[cell] for cell in cells))
+            else:
+                counted.append((cells, result))
+        remaining = max(remaining, 0)
+
+        # Layouts of every counted component together, by mine count
+        prefix = [{0: 1}]
+        for _, result in counted:
+            prefix.append(_convolve(prefix[-1], {
+                mines: total for mines, (total, _) in result.items()
+            }))
+        suffix = [{0: 1}]
+        for _, result in reversed(counted):
+            suffix.append(_convolve(suffix[-1], {
+                mines: total for mines, (total, _) in result.items()
+            }))
+        suffix.reverse()
+
+        # Cells no sentence mentions
+        others = self.unknown - len(self.constraints)
+
+        # Relative number of ways to place the mines left over on the
+        # other cells, by mine count in the components. Logarithms keep
+        # the binomials of large boards in range.
+        most = max(prefix[-1])
+        logWeights = {}
+        for mines in range(most + 1):
+            left = remaining - mines
+            if 0 <= left <= others:
+                logWeights[mines] = (math.lgamma(others + 1)
+                                     - math.lgamma(left + 1)
+                                     - math.lgamma(others - left + 1))
+        if not any(mines in logWeights for mines in prefix[-1]):
+            # The mine count disagrees with the board; ignore it
+            logWeights = dict.fromkeys(range(most + 1), 0)
+        # Only mine counts the components can hold are ever weighted.
+        # Scaling by the largest of their weights keeps them from all
+        # underflowing to 0.
+        logWeights = {
+            mines: logWeight for mines, logWeight in logWeights.items()
+            if mines in prefix[-1]
+        }
+        top = max(logWeights.values())
+        weights = [
+            math.exp(logWeights[mines] - top) if mines in logWeights else 0
+            for mines in range(most + 1)
+        ]
+        total = sum(layouts * weights[m] for m, layouts in prefix[-1].items())
+
+        certain = {}
+        for i, (cells, result) in enumerate(counted):
+            rest = _convolve(prefix[i], suffix[i + 1])
+            numerators = [0] * len(cells)
+            # Whether each cell is a mine in none or all of the layouts
+            # possible with the mine count, decided on exact counts
+            never = [True] * len(cells)
+            always = [True] * len(cells)
+            for mines, (layouts, cellCounts) in result.items():
+                if not any(mines + m in logWeights for m in rest):
+                    continue
+                w = sum(ways * weights[mines + m] for m, ways in rest.items())
+                for k, count in enumerate(cellCounts):
+                    numerators[k] += count * w
+                    never[k] = never[k] and count == 0
+                    always[k] = always[k] and count == layouts
+            for k, cell in enumerate(cells):
+                if never[k]:
+                    certain[cell] = SAFE
+                    probabilities[cell] = 0
+                elif always[k]:
+                    certain[cell] = MINE
+                    probabilities[cell] = 1
+                else:
+                    probabilities[cell] = numerators[k] / total
+
+        density = None
+        othersCertain = None
+        if others:
+            possible = [m for m in prefix[-1] if m in logWeights]
+            expected = sum(
+                prefix[-1][m] * weights[m] * (remaining - m)
+                for m in possible
+            )
+            density = expected / (total * others)
+            if all(remaining - m == 0 for m in possible):
+                othersCertain = SAFE
+                density = 0
+            elif all(remaining - m == others for m in possible):
+                othersCertain = MINE
+                density = 1
+        return probabilities, certain, density, othersCertain
+
+    def _components(self):
+        """
+        Returns the cells in sentences split into groups that share no
+        sentence, as (cells, sentences) pairs. Cells are listed in the
+        order a breadth-first search reaches them, and sentences as
+        (cells, count) pairs.
+        """
+        components = []
+        seen = set()
+        for start in self.constraints:
+            if start in seen or not self.constraints[start]:
+                continue
+            seen.add(start)
+            cells = []
+            keys = set()
+            queue = deque([start])
+            while queue:
+                cell = queue.popleft()
+                cells.append(cell)
+                for key in self.constraints[cell]:
+                    if key in keys:
+                        continue
+                    keys.add(key)
+                    for other in key:
+                        if other not in seen:
+                            seen.add(other)
+                            queue.append(other)
+            sentences = sorted(
+                (key, self.sentences[key].count) for key in keys
+            )
+            components.append((cells, sentences))
+        return components
+
+    def _count_components(self, components):
+        """
+        Returns the result of _count_layouts for each component,
+        reusing the counts of components unchanged since the last call.
+        """
+        deadline = time.monotonic() + self.time_budget
+        cache = {}
+        results = [None] * len(components)
+        pending = []
+        for i, (cells, sentences) in enumerate(components):
+            key = frozenset(sentences)
+            if key in self._layouts:
+                cache[key] = self._layouts[key]
+                results[i] = self._reorder(cache[key], cells)
+            else:
+                pending.append(i)
+
+        if self.workers and len(pending) > 1:
+            with ProcessPoolExecutor(self.workers) as executor:
+                futures = [
+                    executor.submit(_count_layouts, *components[i], deadline)
+                    for i in pending
+                ]
+                counted = [future.result() for future in futures]
         else:
-            # Check if game win
-            temporaryArray = []
-            num_mines = 0
-            for i in board:
-                if i not in self.moves_made:
-                    temporaryArray.append(i)
-                    num_mines += 1
-            if num_mines == 8:
-                self.mines = set()
-                for i in temporaryArray:
-                    self.mines.add(i)
-                return None
-
-            # Actual Random bomb
-            tempVar = 0
-            while True:
-                if tempVar > 80:
-                    if (i,j) not in self.moves_made:
-                        return (i,j)
-                i = random.randrange(8)
-                j = random.randrange(8)
-                if (i,j) not in self.moves_made and (i,j) not in self.mines:
-                    return (i,j)
-                tempVar += 1
-        return None
\ No newline at end of file
+            counted = [_count_layouts(*components[i], deadline) for i in pending]
+
+        for i, result in zip(pending, counted):
+            results[i] = result
+            if result is not None:
+                cache[frozenset(components[i][1])] = (components[i][0], result)
+        self._layouts = cache
+        return results
+
+    def _reorder(self, cached, cells):
+        """
+        Returns cached layout counts with their per-cell counts listed
+        in the order of cells.
+        """
+        cachedCells, result = cached
+        position = {cell: k for k, cell in enumerate(cachedCells)}
+        order = [position[cell] for cell in cells]
+        return {
+            mines: (total, [cellCounts[k] for k in order])
+            for mines, (total, cellCounts) in result.items()
+        }
+
+
+def _convolve(first, second):
+    """
+    Returns the number of layouts with each mine count of two
+    independent groups of cells, given those of each group.
+    """
+    result = {}
+    for m, x in first.items():
+        for n, y in second.items():
+            result[m + n] = result.get(m + n, 0) + x * y
+    return result
+
+
+def _count_layouts(cells, sentences, deadline):
+    """
+    Counts the mine layouts of cells that satisfy every sentence, given
+    as (cells, count) pairs, by backtracking over cells in order.
+
+    Returns {mines: (layouts, cell counts)} where cell counts gives,
+    in the order of cells, the number of those layouts with a mine on
+    each cell, or None if time.monotonic() passes deadline first.
+    """
+    n = len(cells)
+    index = {cell: i for i, cell in enumerate(cells)}
+    need = [count for _, count in sentences]
+    left = [len(sentenceCells) for sentenceCells, _ in sentences]
+    touching = [[] for _ in cells]
+    for s, (sentenceCells, _) in enumerate(sentences):
+        for cell in sentenceCells:
+            touching[index[cell]].append(s)
+
+    results = {}
+    value = [-1] * n
+    mines = 0
+    steps = 0
+    i = 0
+    while i >= 0:
+        steps += 1
+        if not steps & 0xfff and time.monotonic() > deadline:
+            return None
+        if i == n:
+            total, cellCounts = results.get(mines, (0, [0] * n))
+            for k in range(n):
+                cellCounts[k] += value[k]
+            results[mines] = (total + 1, cellCounts)
+            i -= 1
+            continue
+
+        # Undo this cell's last value and try the next one
+        if value[i] >= 0:
+            for s in touching[i]:
+                need[s] += value[i]
+                left[s] += 1
+            mines -= value[i]
+        value[i] += 1
+        if value[i] > 1:
+            value[i] = -1
+            i -= 1
+            continue
+        consistent = True
+        for s in touching[i]:
+            need[s] -= value[i]
+            left[s] -= 1
+            if not 0 <= need[s] <= left[s]:
+                consistent = False
+        mines += value[i]
+        if consistent:
+            i += 1
+    return results
+
+
+def _ones(data, value=1):
+    """
+    Yields the positions in a bytearray holding value.
+    """
+    index = data.find(value)
+    while index != -1:
+        yield index
+        index = data.find(value, index + 1)
@@ -39,7 +39,7 @@ mine = pygame.transform.scale(mine, (cell_size, cell_size))
 
 # Create game and AI agent
 game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES)
 
 # Keep track of revealed cells, flagged cells, and if a mine was hit
 revealed = set()
@@ -100,6 +100,7 @@ while True:
 
     # Draw board
     cells = []
+    counts = game.nearby_mines_grid()
     for i in range(HEIGHT):
         row = []
         for j in range(WIDTH):
@@ -120,7 +121,7 @@ while True:
                 screen.blit(flag, rect)
             elif (i, j) in revealed:
                 neighbors = smallFont.render(
-                    str(game.nearby_mines((i, j))),
+                    str(counts[i][j]),
                     True, BLACK
                 )
                 neighborsTextRect = neighbors.get_rect()
@@ -194,7 +195,7 @@ while True:
         # Reset game state
         elif resetButton.collidepoint(mouse):
             game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-            ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+            ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES)
             revealed = set()
             flags = set()
             lost = False
@@ -214,9 +215,8 @@ while True:
         if game.is_mine(move):
             lost = True
         else:
-            nearby = game.nearby_mines(move)
-            revealed.add(move)
-            ai.add_knowledge(move, nearby)
-            #print(ai.hiddenneighbours(move))
+            cells = game.reveal(move)
+            revealed.update(cell for cell, _ in cells)
+            ai.add_revealed(cells)
 
     pygame.display.flip()
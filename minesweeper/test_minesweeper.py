@@ -0,0 +1,254 @@
+import itertools
+import random
+from collections import deque
+
+import pytest
+
+from minesweeper import Grid, Minesweeper, MinesweeperAI, Sentence, _count_layouts
+
+
+def play(game, ai, generator, guesses=True):
+    """
+    Plays until the AI runs out of moves or hits a mine, checking that
+    nothing it infers is wrong. Returns True if every safe cell was
+    revealed.
+    """
+    safe_cells = game.height * game.width - len(game.mines)
+    while True:
+        assert ai.mines <= game.mines
+        assert not ai.safes & game.mines
+        move = ai.make_safe_move()
+        if move is None:
+            if not guesses:
+                return False
+            move = ai.make_random_move()
+            if move is None:
+                return len(ai.moves_made) == safe_cells
+            if game.is_mine(move):
+                return False
+        else:
+            assert not game.is_mine(move)
+        ai.add_revealed(game.reveal(move))
+        if len(ai.moves_made) == safe_cells:
+            return True
+
+
+def test_sentence_known_cells():
+    assert Sentence({(0, 0), (0, 1)}, 2).known_mines() == {(0, 0), (0, 1)}
+    assert Sentence({(0, 0), (0, 1)}, 0).known_safes() == {(0, 0), (0, 1)}
+    sentence = Sentence({(0, 0), (0, 1)}, 1)
+    assert sentence.known_mines() == set()
+    assert sentence.known_safes() == set()
+    sentence.mark_mine((0, 0))
+    assert sentence == Sentence({(0, 1)}, 0)
+    sentence.mark_safe((0, 1))
+    assert sentence == Sentence(set(), 0)
+
+
+def test_subset_inference():
+    # Row 0 is hidden; row 1 reads 1 1 0 from the left
+    ai = MinesweeperAI(height=2, width=3)
+    ai.add_knowledge((1, 2), 0)
+    ai.add_knowledge((1, 1), 1)
+    ai.add_knowledge((1, 0), 1)
+    assert ai.safes >= {(0, 1), (0, 2)}
+    assert ai.mines == {(0, 0)}
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_inference_is_sound(seed):
+    random.seed(seed)
+    game = Minesweeper(height=8, width=8, mines=8)
+    ai = MinesweeperAI(height=8, width=8)
+    play(game, ai, random.Random(seed))
+
+
+def brute_force_probabilities(ai, unknown):
+    """Chance each unknown cell is a mine, over every consistent layout."""
+    remaining = ai.total_mines - len(ai.mines)
+    counts = dict.fromkeys(unknown, 0)
+    layouts = 0
+    for placed in itertools.combinations(unknown, remaining):
+        placed = set(placed) | ai.mines
+        if all(
+            len(placed & set(ai.neighbours(cell))) == count
+            for cell, count in ai.knowledge.items()
+        ):
+            layouts += 1
+            for cell in placed:
+                if cell in counts:
+                    counts[cell] += 1
+    return {cell: count / layouts for cell, count in counts.items()}
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_mine_probabilities_are_exact(seed):
+    generator = random.Random(seed)
+    random.seed(seed)
+    game = Minesweeper(height=4, width=5, mines=5)
+    ai = MinesweeperAI(height=4, width=5, mines=5)
+    for _ in range(3):
+        move = ai.make_safe_move() or ai.make_random_move()
+        if move is None or game.is_mine(move):
+            break
+        ai.add_knowledge(move, game.nearby_mines(move))
+    probabilities = ai.mine_probabilities()
+    unknown = list(probabilities)
+    assert set(unknown) == (
+        set(itertools.product(range(4), range(5)))
+        - ai.moves_made - ai.mines - ai.safes
+    )
+    if not unknown:
+        return
+    expected = brute_force_probabilities(ai, unknown)
+    for cell in unknown:
+        assert probabilities[cell] == pytest.approx(expected[cell])
+
+
+def test_parallel_guessing_matches_serial():
+    random.seed(7)
+    game = Minesweeper(height=16, width=16, mines=40)
+    serial = MinesweeperAI(height=16, width=16, mines=40)
+    parallel = MinesweeperAI(height=16, width=16, mines=40, workers=2)
+    for _ in range(6):
+        move = serial.make_safe_move() or serial.make_random_move()
+        if move is None or game.is_mine(move):
+            break
+        serial.add_knowledge(move, game.nearby_mines(move))
+        parallel.add_knowledge(move, game.nearby_mines(move))
+    assert serial.make_random_move() == parallel.make_random_move()
+
+
+def test_counting_gives_up_at_deadline():
+    cells = [(0, j) for j in range(30)]
+    assert _count_layouts(cells, [(frozenset(cells), 15)], 0) is None
+    assert _count_layouts(cells[:3], [(frozenset(cells[:3]), 1)], 0) == {
+        1: (3, [1, 1, 1])
+    }
+
+
+def test_guessing_wins_most_small_games():
+    wins = 0
+    for seed in range(50):
+        random.seed(seed)
+        game = Minesweeper(height=8, width=8, mines=8)
+        ai = MinesweeperAI(height=8, width=8, mines=8)
+        wins += play(game, ai, random.Random(seed))
+    assert wins >= 40
+
+
+@pytest.mark.parametrize("height,width", [(1, 1), (1, 5), (4, 1), (3, 7), (9, 4)])
+def test_grid_neighbours(height, width):
+    grid = Grid(height, width)
+    for i in range(height):
+        for j in range(width):
+            expected = {
+                (i + di, j + dj)
+                for di in (-1, 0, 1) for dj in (-1, 0, 1)
+                if (di, dj) != (0, 0)
+                and 0 <= i + di < height and 0 <= j + dj < width
+            }
+            neighbours = grid.neighbours(grid.index((i, j)))
+            assert {grid.cell(n) for n in neighbours} == expected
+            assert len(neighbours) == len(expected)
+
+
+def test_mines_avoid_corners_on_any_board():
+    random.seed(0)
+    game = Minesweeper(height=5, width=12, mines=56)
+    assert len(game.mines) == 56
+    assert not game.mines & {(0, 0), (0, 11), (4, 0), (4, 11)}
+    with pytest.raises(ValueError):
+        Minesweeper(height=5, width=12, mines=57)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_inference_is_sound_on_wide_boards(seed):
+    random.seed(seed)
+    game = Minesweeper(height=9, width=23, mines=30)
+    ai = MinesweeperAI(height=9, width=23, mines=30)
+    play(game, ai, random.Random(seed))
+
+
+@pytest.mark.parametrize("height,width,mines", [(8, 8, 8), (1, 9, 3), (13, 6, 60)])
+def test_nearby_mines_counts_neighbours(height, width, mines):
+    random.seed(height)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    grid = game.nearby_mines_grid()
+    assert len(grid) == height
+    for i in range(height):
+        for j in range(width):
+            expected = sum(
+                (i + di, j + dj) in game.mines
+                for di in (-1, 0, 1) for dj in (-1, 0, 1)
+                if (di, dj) != (0, 0)
+            )
+            assert game.nearby_mines((i, j)) == expected
+            assert grid[i][j] == expected
+
+
+def flood(game, cell):
+    """Cells a click on cell opens, found by repeated whole-board scans."""
+    opened = {cell}
+    changed = True
+    while changed:
+        changed = False
+        for (i, j) in list(opened):
+            if game.nearby_mines((i, j)):
+                continue
+            for di in (-1, 0, 1):
+                for dj in (-1, 0, 1):
+                    other = (i + di, j + dj)
+                    if (0 <= other[0] < game.height
+                            and 0 <= other[1] < game.width
+                            and other not in opened):
+                        opened.add(other)
+                        changed = True
+    return opened
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_reveal_opens_zero_regions(seed):
+    random.seed(seed)
+    game = Minesweeper(height=12, width=17, mines=20)
+    revealed = game.reveal((0, 0))
+    assert {cell for cell, _ in revealed} == flood(game, (0, 0))
+    assert len(revealed) == len({cell for cell, _ in revealed})
+    for cell, count in revealed:
+        assert not game.is_mine(cell)
+        assert count == game.nearby_mines(cell)
+    assert game.reveal((0, 0)) == []
+    mine = next(iter(game.mines))
+    with pytest.raises(ValueError):
+        game.reveal(mine)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_bulk_knowledge_matches_one_cell_at_a_time(seed):
+    random.seed(seed)
+    game = Minesweeper(height=10, width=10, mines=15)
+    bulk = MinesweeperAI(height=10, width=10, mines=15)
+    single = MinesweeperAI(height=10, width=10, mines=15)
+    revealed = game.reveal((0, 0))
+    bulk.add_revealed(revealed)
+    for cell, count in revealed:
+        single.add_knowledge(cell, count)
+    assert bulk.moves_made == single.moves_made
+    assert bulk.mines == single.mines
+    assert bulk.safes == single.safes
+
+
+
+def test_guessing_far_from_the_likeliest_mine_count():
+    # 700 pairs holding one mine each leave 199,300 mines for the rest
+    # of a huge board, far from the mine count weighted most heavily
+    ai = MinesweeperAI(height=1000, width=1000, mines=200000)
+    queue = deque()
+    for i in range(700):
+        ai._add_sentence([10 * i, 10 * i + 1], 1, queue)
+    ai._propagate(queue)
+    assert ai.make_random_move() is not None
+    assert ai.mines == set()
+    probabilities = ai.mine_probabilities()
+    assert probabilities[(0, 0)] == pytest.approx(0.5)
+    assert probabilities[(999, 999)] == pytest.approx(199300 / 998600)
@@ -0,0 +1,281 @@
+"""
+Benchmark crawling, sampling and iterating PageRank on synthetic graphs.
+
+Usage: python benchmark.py [--graphs ...] [--sizes ...] [--corpora ...]
+                           [--html] [--samples N] [--output results.json]
+
+Results are written as JSON so they can be compared across releases.
+Each graph is measured in a fresh process, so its peak memory use is
+its own.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pagerank
+
+GRAPHS = ["random", "scale-free", "chain", "dangling"]
+CORPORA = ["corpus0", "corpus1", "corpus2"]
+SIZES = [1000, 10000]
+LINKS = 10
+SAMPLES = 100000
+TRANSITION_QUERIES = 1000
+TOLERANCE = 1e-8
+
+
+def _names(pages):
+    return [f"{i}.html" for i in range(pages)]
+
+
+def random_corpus(pages, links, seed=0):
+    """
+    Return a corpus of `pages` pages, each linking to up to `links`
+    other pages chosen uniformly at random.
+    """
+    generator = random.Random(seed)
+    names = _names(pages)
+    corpus = {}
+    for i, name in enumerate(names):
+        targets = {
+            names[generator.randrange(pages)]
+            for _ in range(generator.randrange(links + 1))
+        }
+        corpus[name] = targets - {name}
+    return corpus
+
+
+def scale_free_corpus(pages, links, seed=0):
+    """
+    Return a corpus grown by preferential attachment: every new page
+    links to up to `links` earlier pages, chosen in proportion to how
+    often they are already linked to, so in-degrees follow a power law.
+    """
+    generator = random.Random(seed)
+    names = _names(pages)
+    corpus = {names[0]: set()}
+    # Every page appears once, plus once per link pointing at it
+    weighted = [0]
+    for i in range(1, pages):
+        targets = {
+            generator.choice(weighted)
+            for _ in range(min(i, generator.randint(1, links)))
+        }
+        corpus[names[i]] = {names[target] for target in targets}
+        weighted.append(i)
+        weighted.extend(targets)
+    return corpus
+
+
+def chain_corpus(pages, links=None, seed=0):
+    """
+    Return a corpus where every page links only to the next one, the
+    slowest case for power iteration to spread rank.
+    """
+    names = _names(pages)
+    corpus = {name: {following} for name, following in zip(names, names[1:])}
+    corpus[names[-1]] = set()
+    return corpus
+
+
+def dangling_corpus(pages, links, seed=0):
+    """
+    Return a random corpus where nine pages in ten have no links.
+    """
+    generator = random.Random(seed)
+    corpus = random_corpus(pages, links, seed)
+    for name in corpus:
+        if generator.random() < 0.9:
+            corpus[name] = set()
+    return corpus
+
+
+GENERATORS = {
+    "random": random_corpus,
+    "scale-free": scale_free_corpus,
+    "chain": chain_corpus,
+    "dangling": dangling_corpus,
+}
+
+
+def write_html_corpus(corpus, directory):
+    """
+    Write `corpus` to `directory` as one HTML page per entry, in the
+    layout `pagerank.crawl` reads.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for page, links in corpus.items():
+        with open(os.path.join(directory, page), "w") as f:
+            f.write(f"<!DOCTYPE html>\n<html>\n<head><title>{page}</title>"
+                    "</head>\n<body>\n")
+            for link in sorted(links):
+                f.write(f'<a href="{link}">{link}</a>\n')
+            f.write("</body>\n</html>\n")
+
+
+def peak_rss():
+    """
+    Return the peak resident set size of this process so far, in KiB.
+    This covers the whole life of the process, so each graph is
+    benchmarked in a process of its own.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def benchmark_solvers(corpus, damping=pagerank.DAMPING, tol=TOLERANCE):
+    """
+    Run every solver on `corpus` and return one result per solver with
+    its wall time, number of sweeps, and largest difference from the
+    ranks computed by the "jacobi" solver.
+    """
+    results = []
+    baseline = None
+    for solver in pagerank.SOLVERS:
+        (ranks, log), seconds = _timed(
+            pagerank.iterate_pagerank, corpus, damping, tol=tol,
+            solver=solver, return_log=True
+        )
+        if baseline is None:
+            baseline = ranks
+        results.append({
+            "solver": solver,
+            "seconds": seconds,
+            "iterations": len(log),
+            "error": max(abs(ranks[page] - baseline[page]) for page in ranks),
+        })
+    return results
+
+
+def benchmark_corpus(name, corpus, samples=SAMPLES, html=False,
+                     damping=pagerank.DAMPING):
+    """
+    Return the measurements for one corpus as a dictionary.
+    """
+    result = {
+        "graph": name,
+        "pages": len(corpus),
+        "links": sum(map(len, corpus.values())),
+    }
+
+    if html:
+        with tempfile.TemporaryDirectory() as directory:
+            write_html_corpus(corpus, directory)
+            _, seconds = _timed(pagerank.crawl, directory)
+            result["crawl_seconds"] = seconds
+
+    graph = pagerank.Graph.from_corpus(corpus)
+    pages = graph.pages
+    generator = random.Random(0)
+    queries = [
+        pages[generator.randrange(len(pages))]
+        for _ in range(TRANSITION_QUERIES)
+    ]
+    table = pagerank.transition_table(graph, damping)
+    _, seconds = _timed(lambda: [table.draw(page) for page in queries])
+    result["transition_draw_seconds"] = seconds / TRANSITION_QUERIES
+
+    (iterated, log), seconds = _timed(
+        pagerank.iterate_pagerank, graph, damping, tol=TOLERANCE,
+        return_log=True
+    )
+    result["iterate_seconds"] = seconds
+    result["iterations"] = len(log)
+
+    sampled, seconds = _timed(
+        pagerank.sample_pagerank, graph, damping, samples, seed=0
+    )
+    result["samples"] = samples
+    result["sample_seconds"] = seconds
+    result["sample_error"] = max(
+        abs(sampled[page] - iterated[page]) for page in iterated
+    )
+
+    result["solvers"] = benchmark_solvers(graph, damping)
+    result["peak_rss_kb"] = peak_rss()
+    return result
+
+
+def benchmark_bundled(name, directory, samples=SAMPLES, html=False):
+    """
+    Crawl the corpus in `directory` and return its measurements.
+    """
+    corpus = pagerank.crawl(directory)
+    return benchmark_corpus(name, corpus, samples=samples, html=html)
+
+
+def benchmark_generated(name, size, links, samples=SAMPLES, html=False):
+    """
+    Generate a `name` graph of `size` pages and return its measurements.
+    """
+    corpus = GENERATORS[name](size, links)
+    return benchmark_corpus(name, corpus, samples=samples, html=html)
+
+
+def _isolated(function, *args, **kwargs):
+    """
+    Return `function(*args, **kwargs)`, run in a freshly started process.
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(1, mp_context=context) as executor:
+        return executor.submit(function, *args, **kwargs).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--graphs", nargs="+", choices=GRAPHS, default=GRAPHS)
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES)
+    parser.add_argument("--corpora", nargs="*", default=CORPORA,
+                        help="bundled corpus directories to include")
+    parser.add_argument("--links", type=int, default=LINKS)
+    parser.add_argument("--samples", type=int, default=SAMPLES)
+    parser.add_argument("--html", action="store_true",
+                        help="also time crawling the graphs as HTML")
+    parser.add_argument("--output", help="write JSON here, not to stdout")
+    args = parser.parse_args()
+
+    results = []
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in args.corpora:
+        results.append(_isolated(
+            benchmark_bundled, name, os.path.join(here, name),
+            samples=args.samples, html=args.html
+        ))
+    for size in args.sizes:
+        for name in args.graphs:
+            results.append(_isolated(
+                benchmark_generated, name, size, args.links,
+                samples=args.samples, html=args.html
+            ))
+            print(f"{name} {size}: done", file=sys.stderr)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
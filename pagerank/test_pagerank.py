@@ -0,0 +1,316 @@
+import csv
+import io
+import json
+import os
+from array import array
+
+import pytest
+
+import benchmark
+import pagerank
+from benchmark import random_corpus
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPORA = [os.path.join(HERE, f"corpus{i}") for i in range(3)]
+
+
+@pytest.mark.parametrize("directory", CORPORA)
+@pytest.mark.parametrize("solver", list(pagerank.SOLVERS))
+def test_solvers_match_jacobi(directory, solver):
+    corpus = pagerank.crawl(directory)
+    tol = 1e-10
+    expected = pagerank.iterate_pagerank(corpus, pagerank.DAMPING, tol=tol)
+    ranks = pagerank.iterate_pagerank(
+        corpus, pagerank.DAMPING, tol=tol, solver=solver
+    )
+    for page in corpus:
+        assert ranks[page] == pytest.approx(expected[page], abs=1e-6)
+
+
+@pytest.mark.parametrize("solver", list(pagerank.SOLVERS))
+def test_solvers_match_jacobi_on_synthetic_graph(solver):
+    corpus = random_corpus(500, 6, seed=1)
+    expected = pagerank.iterate_pagerank(corpus, pagerank.DAMPING, tol=1e-12)
+    ranks = pagerank.iterate_pagerank(
+        corpus, pagerank.DAMPING, tol=1e-10, solver=solver
+    )
+    for page in corpus:
+        assert ranks[page] == pytest.approx(expected[page], abs=1e-6)
+
+
+def test_links_outside_corpus_are_ignored():
+    ranks = pagerank.iterate_pagerank(
+        {"a": {"b", "zz"}, "b": {"a"}}, pagerank.DAMPING
+    )
+    assert set(ranks) == {"a", "b"}
+    assert sum(ranks.values()) == pytest.approx(1)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 8, 13, 64])
+def test_extract_links_across_chunk_boundaries(tmp_path, chunk_size):
+    path = tmp_path / "page.html"
+    path.write_text(
+        '<p>Intro <b>bold</b> < a\n'
+        '<a href="one.html">One</a>'
+        '<a class="x" id="y"\n href="two.html">Two</a>'
+        '<a href="a>b.html">Odd</a>'
+        '<a <b href="three.html">Nested</a>'
+        '<abbr href="not-a-link.html">'
+        '<a href=""></a>'
+        '<a href="four.html'
+    )
+    contents = path.read_text()
+    expected = set(pagerank.LINK_PATTERN.findall(contents))
+    assert pagerank.extract_links(str(path), chunk_size) == expected
+
+
+@pytest.mark.parametrize("directory", CORPORA)
+def test_extract_links_matches_whole_file(directory):
+    for filename in os.listdir(directory):
+        path = os.path.join(directory, filename)
+        with open(path) as f:
+            expected = set(pagerank.LINK_PATTERN.findall(f.read()))
+        for chunk_size in (1, 7, 100):
+            assert pagerank.extract_links(path, chunk_size) == expected
+
+
+def test_sample_pagerank_is_reproducible():
+    corpus = pagerank.crawl(CORPORA[2])
+    first = pagerank.sample_pagerank(corpus, pagerank.DAMPING, 20000, seed=4)
+    second = pagerank.sample_pagerank(corpus, pagerank.DAMPING, 20000, seed=4)
+    assert first == second
+    assert sum(first.values()) == pytest.approx(1)
+
+
+def test_sample_pagerank_rejects_no_samples():
+    with pytest.raises(ValueError):
+        pagerank.sample_pagerank({"a": set()}, pagerank.DAMPING, 0)
+
+
+def test_parallel_sampling_is_reproducible():
+    corpus = pagerank.crawl(CORPORA[1])
+    first = pagerank.sample_pagerank(
+        corpus, pagerank.DAMPING, 50000, seed=2, workers=2
+    )
+    second = pagerank.sample_pagerank(
+        corpus, pagerank.DAMPING, 50000, seed=2, workers=2
+    )
+    assert first == second
+    expected = pagerank.iterate_pagerank(corpus, pagerank.DAMPING)
+    for page in corpus:
+        assert first[page] == pytest.approx(expected[page], abs=0.02)
+
+
+def test_transition_model_sees_rewired_links():
+    corpus = {"a": {"b"}, "b": {"c"}, "c": {"a"}}
+    assert pagerank.transition_model(corpus, "c", 0.85)["a"] == pytest.approx(0.9)
+    corpus["c"] = {"b"}
+    distribution = pagerank.transition_model(corpus, "c", 0.85)
+    assert distribution["a"] == pytest.approx(0.05)
+    assert distribution["b"] == pytest.approx(0.9)
+
+
+def test_transition_model_reads_dict_corpus_directly(monkeypatch):
+    corpus = random_corpus(300, 5, seed=6)
+    corpus["1.html"].add("missing.html")
+    graph = pagerank.Graph.from_corpus(corpus)
+    expected = {
+        page: pagerank.transition_model(graph, page, 0.85) for page in corpus
+    }
+
+    def from_corpus(corpus):
+        raise AssertionError("dict lookups should not snapshot the corpus")
+
+    monkeypatch.setattr(pagerank.Graph, "from_corpus", from_corpus)
+    for page in corpus:
+        distribution = pagerank.transition_model(corpus, page, 0.85)
+        assert distribution == pytest.approx(expected[page])
+
+
+def test_graph_reuses_its_transition_table():
+    graph = pagerank.Graph.from_corpus({"a": {"b"}, "b": set()})
+    table = pagerank.transition_table(graph, 0.85)
+    assert pagerank.transition_table(graph, 0.85) is table
+    assert table.probability("a", "b") == pytest.approx(0.925)
+    assert table.probability("b", "a") == pytest.approx(0.5)
+
+
+def test_iterate_pagerank_returns_log():
+    corpus = pagerank.crawl(CORPORA[0])
+    seen = []
+    ranks, log = pagerank.iterate_pagerank(
+        corpus, pagerank.DAMPING, norm="l1", max_iter=5,
+        callback=seen.append, return_log=True
+    )
+    assert log == seen
+    assert [entry["iteration"] for entry in log] == [1, 2, 3, 4, 5]
+    assert set(ranks) == set(corpus)
+
+
+def test_iterate_pagerank_rejects_unknown_norm():
+    with pytest.raises(ValueError):
+        pagerank.iterate_pagerank({"a": set()}, pagerank.DAMPING, norm="l2")
+
+
+def assert_ranks_match(corpus, ranks, abs=1e-6):
+    expected = pagerank.iterate_pagerank(corpus, pagerank.DAMPING, tol=1e-12)
+    assert set(ranks) == set(expected)
+    for page in expected:
+        assert ranks[page] == pytest.approx(expected[page], abs=abs)
+
+
+@pytest.mark.parametrize("delta", [
+    {"added_links": [("10.html", "20.html"), ("11.html", "3.html")]},
+    {"removed_links": [("5.html", next_link) for next_link in ["6.html"]]},
+    {"added_pages": ["new.html"], "added_links": [("new.html", "1.html")]},
+    {"removed_pages": ["7.html"]},
+])
+def test_update_pagerank_matches_recomputation(delta):
+    corpus = random_corpus(300, 6, seed=3)
+    corpus["5.html"].add("6.html")
+    ranks = pagerank.iterate_pagerank(corpus, pagerank.DAMPING, tol=1e-12)
+    pagerank.update_pagerank(
+        corpus, ranks, pagerank.DAMPING, tol=1e-10, **delta
+    )
+    assert_ranks_match(corpus, ranks)
+
+
+def test_update_pagerank_rejects_unknown_pages():
+    corpus = {"a": {"b"}, "b": set()}
+    ranks = pagerank.iterate_pagerank(corpus, pagerank.DAMPING)
+    with pytest.raises(ValueError):
+        pagerank.update_pagerank(
+            corpus, ranks, pagerank.DAMPING, added_links=[("a", "c")]
+        )
+
+
+def test_saved_graph_loads_with_same_ranks(tmp_path):
+    corpus = pagerank.crawl(CORPORA[1])
+    path = tmp_path / "corpus1.graph"
+    pagerank.compile_corpus(CORPORA[1], path)
+    graph = pagerank.load_graph(path)
+    assert list(graph.pages) == sorted(corpus)
+    # The transposed adjacency is stored, not rebuilt on load
+    assert graph._incoming is not None
+    inOffsets, sources = graph.incoming()
+    expected = pagerank.Graph.from_corpus(corpus).incoming()
+    assert list(inOffsets) == list(expected[0])
+    assert list(sources) == list(expected[1])
+    assert graph.index["search.html"] == sorted(corpus).index("search.html")
+    assert pagerank.iterate_pagerank(graph, pagerank.DAMPING) == (
+        pagerank.iterate_pagerank(corpus, pagerank.DAMPING)
+    )
+    assert pagerank.sample_pagerank(
+        graph, pagerank.DAMPING, 2000, seed=1, workers=2
+    ) == pagerank.sample_pagerank(
+        corpus, pagerank.DAMPING, 2000, seed=1, workers=2
+    )
+
+
+def test_graph_file_sections_are_aligned(tmp_path):
+    header = len(pagerank.GRAPH_MAGIC) + pagerank.GRAPH_HEADER.size
+    assert header % 8 == 0
+    graph = pagerank.Graph.from_corpus({"a.html": {"b.html"}, "b.html": set()})
+    pagerank.save_graph(graph, tmp_path / "g")
+    loaded = pagerank.load_graph(tmp_path / "g")
+    assert loaded.incoming()[1].tolist() == [0]
+
+
+def test_load_graph_rejects_other_files(tmp_path):
+    path = tmp_path / "page.html"
+    path.write_text("<html></html>")
+    with pytest.raises(ValueError):
+        pagerank.load_graph(path)
+
+
+def test_uniform_personalization_is_global_pagerank():
+    corpus = pagerank.crawl(CORPORA[2])
+    uniform = dict.fromkeys(corpus, 1)
+    ranks = pagerank.personalized_pagerank(
+        corpus, pagerank.DAMPING, uniform, tol=1e-10
+    )
+    assert_ranks_match(corpus, ranks)
+
+
+def test_batched_personalization_matches_single_vectors():
+    corpus = random_corpus(200, 5, seed=4)
+    teleports = [{"1.html": 1}, {"2.html": 3, "50.html": 1}, {"7.html": 1}]
+    batch = pagerank.personalized_pagerank(
+        corpus, pagerank.DAMPING, teleports, tol=1e-10
+    )
+    assert len(batch) == len(teleports)
+    for teleport, ranks in zip(teleports, batch):
+        single = pagerank.personalized_pagerank(
+            corpus, pagerank.DAMPING, teleport, tol=1e-10
+        )
+        assert ranks == pytest.approx(single, abs=1e-8)
+        assert sum(ranks.values()) == pytest.approx(1)
+    assert batch[0]["1.html"] > batch[1]["1.html"]
+
+
+def test_top_k_pagerank_matches_full_ranking():
+    corpus = random_corpus(2000, 8, seed=5)
+    expected = pagerank.iterate_pagerank(corpus, pagerank.DAMPING, tol=1e-12)
+    best = sorted(expected, key=expected.get, reverse=True)[:10]
+    top = pagerank.top_k_pagerank(corpus, pagerank.DAMPING, 10, tol=1e-12)
+    assert [page for page, _ in top] == best
+    for page, rank in top:
+        assert rank == pytest.approx(expected[page], abs=1e-3)
+
+
+def test_top_k_pagerank_default_stops_on_gap_bound():
+    corpus = random_corpus(20000, 8, seed=1)
+    expected = pagerank.iterate_pagerank(corpus, pagerank.DAMPING, tol=1e-14)
+    best = sorted(expected, key=expected.get, reverse=True)[:100]
+    top = pagerank.top_k_pagerank(corpus, pagerank.DAMPING, 100)
+    assert [page for page, _ in top] == best
+
+
+def test_top_k_pagerank_rejects_no_iterations():
+    with pytest.raises(ValueError):
+        pagerank.top_k_pagerank({"a": set()}, pagerank.DAMPING, 1, max_iter=0)
+
+
+@pytest.mark.parametrize("name", list(benchmark.GENERATORS))
+def test_synthetic_graphs_round_trip_through_html(tmp_path, name):
+    corpus = benchmark.GENERATORS[name](50, 4, seed=1)
+    assert len(corpus) == 50
+    benchmark.write_html_corpus(corpus, tmp_path)
+    assert pagerank.crawl(tmp_path) == corpus
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 4096])
+def test_write_ranks_formats(chunk_size):
+    pages = ["a.html", "b.html", "c.html", "d.html"]
+    ranks = [0.1, 0.2, 0.3, 0.4]
+
+    text = io.StringIO()
+    pagerank.write_ranks(pages, ranks, text, "text", "Title", chunk_size)
+    assert text.getvalue().splitlines() == [
+        "Title", "  a.html: 0.1000", "  b.html: 0.2000",
+        "  c.html: 0.3000", "  d.html: 0.4000",
+    ]
+
+    rows = io.StringIO()
+    pagerank.write_ranks(pages, ranks, rows, "csv", chunk_size=chunk_size)
+    assert rows.getvalue().splitlines()[1:] == [
+        f"{page},{rank!r}" for page, rank in zip(pages, ranks)
+    ]
+
+    odd = ["a,b.html", 'say "hi".html', "two\nlines.html", "plain.html"]
+    rows = io.StringIO()
+    pagerank.write_ranks(odd, ranks, rows, "csv", chunk_size=chunk_size)
+    rows.seek(0)
+    assert list(csv.reader(rows)) == [["page", "rank"]] + [
+        [page, repr(rank)] for page, rank in zip(odd, ranks)
+    ]
+
+    lines = io.StringIO()
+    pagerank.write_ranks(pages, ranks, lines, "jsonl", chunk_size=chunk_size)
+    assert [json.loads(line) for line in lines.getvalue().splitlines()] == [
+        {"page": page, "rank": rank} for page, rank in zip(pages, ranks)
+    ]
+
+    raw = io.BytesIO()
+    pagerank.write_ranks(pages, ranks, raw, "f64", chunk_size=chunk_size)
+    assert list(array("d", raw.getvalue())) == ranks
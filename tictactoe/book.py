@@ -0,0 +1,21 @@
+"""
+Writes the tictactoe opening book.
+
+Usage: python book.py [path]
+"""
+
+import sys
+
+import tictactoe as ttt
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python book.py [path]")
+    path = sys.argv[1] if len(sys.argv) == 2 else ttt.BOOK_PATH
+    count = ttt.generate_book(path)
+    print(f"Wrote {count} positions to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Generalized m,n,k-game: an m x n board where k in a row wins.
+
+Tic Tac Toe is the 3,3,3 game.
+"""
+
+import math
+import time
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# Score of a won position, before the bonus for winning sooner
+WIN = 10 ** 6
+# Heuristic value of an open line holding this many stones of one player
+LINE_WEIGHTS = (0, 1, 10, 100, 1000, 10000, 100000)
+# Boards larger than this only consider cells next to a played stone
+NEIGHBOURHOOD_MIN_SIZE = 16
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its time budget runs out.
+    """
+
+
+class MNKGame():
+    """
+    Rules and search for one board size.
+
+    Boards are lists of rows, like the Tic Tac Toe board. The search
+    works on two bitboards, one per player, where bit r * cols + c is
+    cell (r, c).
+    """
+
+    def __init__(self, rows=3, cols=3, k=3):
+        if rows < 1 or cols < 1 or not 1 <= k <= max(rows, cols):
+            raise ValueError(f"Invalid game: {rows} x {cols}, {k} in a row")
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.size = rows * cols
+        self.full = (1 << self.size) - 1
+
+        # Every run of k cells in a row, column or diagonal
+        lines = []
+        for r in range(rows):
+            for c in range(cols):
+                for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    endRow = r + dr * (k - 1)
+                    endCol = c + dc * (k - 1)
+                    if not (0 <= endRow < rows and 0 <= endCol < cols):
+                        continue
+                    mask = 0
+                    for step in range(k):
+                        mask |= 1 << ((r + dr * step) * cols + c + dc * step)
+                    lines.append(mask)
+        self.lines = tuple(lines)
+        self.lines_through = tuple(
+            tuple(line for line in self.lines if line >> cell & 1)
+            for cell in range(self.size)
+        )
+
+        # Cells adjacent to each cell, as a mask
+        self.neighbours = []
+        for r in range(rows):
+            for c in range(cols):
+                mask = 0
+                for i in range(max(0, r - 1), min(rows, r + 2)):
+                    for j in range(max(0, c - 1), min(cols, c + 2)):
+                        if (i, j) != (r, c):
+                            mask |= 1 << (i * cols + j)
+                self.neighbours.append(mask)
+
+    def initial_state(self):
+        """
+        Returns the empty board.
+        """
+        return [[EMPTY] * self.cols for _ in range(self.rows)]
+
+    def player(self, board):
+        """
+        Returns the player who has the next turn on the board.
+        """
+        x, o = self.to_bitboard(board)
+        return self.bitboard_player(x, o)
+
+    def actions(self, board):
+        """
+        Returns the empty cells of the board, in row-major order.
+        """
+        return [
+            (i, j) for i in range(self.rows) for j in range(self.cols)
+            if board[i][j] == EMPTY
+        ]
+
+    def result(self, board, action):
+        """
+        Returns a new board with the current player's mark on action.
+        """
+        i, j = action
+        if not (0 <= i < self.rows and 0 <= j < self.cols):
+            raise ValueError(f"Action off the board: {action}")
+        if board[i][j] != EMPTY:
+            raise ValueError(f"Cell already taken: {action}")
+        newBoard = [row[:] for row in board]
+        newBoard[i][j] = self.player(board)
+        return newBoard
+
+    def winner(self, board):
+        """
+        Returns the winner of the game, if there is one.
+        """
+        return self.bitboard_winner(*self.to_bitboard(board))
+
+    def terminal(self, board):
+        """
+        Returns True if the game is over.
+        """
+        return self.bitboard_terminal(*self.to_bitboard(board))
+
+    def utility(self, board):
+        """
+        Returns 1 if X has won, -1 if O has won, 0 otherwise.
+        """
+        return {X: 1, O: -1}.get(self.winner(board), 0)
+
+    def to_bitboard(self, board):
+        """
+        Returns the (X, O) bitboards of a list board.
+        """
+        x = o = 0
+        bit = 1
+        for row in board:
+            for cell in row:
+                if cell == X:
+                    x |= bit
+                elif cell == O:
+                    o |= bit
+                bit <<= 1
+        return x, o
+
+    def from_bitboard(self, x, o):
+        """
+        Returns the list board of the (X, O) bitboards.
+        """
+        board = self.initial_state()
+        for cell in range(self.size):
+            if x >> cell & 1:
+                board[cell // self.cols][cell % self.cols] = X
+            elif o >> cell & 1:
+                board[cell // self.cols][cell % self.cols] = O
+        return board
+
+    def bitboard_player(self, x, o):
+        """
+        Returns the player who has the next turn on the bitboards.
+        """
+        return O if x.bit_count() > o.bit_count() else X
+
+    def bitboard_winner(self, x, o):
+        """
+        Returns the winner on the bitboards, if there is one.
+        """
+        for line in self.lines:
+            if x & line == line:
+                return X
+            if o & line == line:
+                return O
+        return None
+
+    def bitboard_terminal(self, x, o):
+        """
+        Returns True if the game on the bitboards is over.
+        """
+        return (x | o) == self.full or self.bitboard_winner(x, o) is not None
+
+    def wins_at(self, mask, cell):
+        """
+        Returns True if mask completes a line through cell. Only the
+        lines through the last move need checking after it is played.
+        """
+        for line in self.lines_through[cell]:
+            if mask & line == line:
+                return True
+        return False
+
+    def evaluate(self, x, o):
+        """
+        Returns a heuristic score of an unfinished position from X's
+        point of view: every line still open to only one player counts
+        for that player, more steeply the more stones it holds.
+        """
+        score = 0
+        for line in self.lines:
+            if not line & o:
+                score += LINE_WEIGHTS[min((x & line).bit_count(), 6)]
+            elif not line & x:
+                score -= LINE_WEIGHTS[min((o & line).bit_count(), 6)]
+        return score
+
+    def candidate_moves(self, x, o):
+        """
+        Returns the cells worth searching, in row-major order. On large
+        boards these are the empty cells next to a played stone, or the
+        centre on an empty board.
+        """
+        taken = x | o
+        empty = self.full & ~taken
+        if self.size > NEIGHBOURHOOD_MIN_SIZE:
+            if not taken:
+                return [(self.rows // 2) * self.cols + self.cols // 2]
+            near = 0
+            remaining = taken
+            while remaining:
+                low = remaining & -remaining
+                near |= self.neighbours[low.bit_length() - 1]
+                remaining ^= low
+            empty &= near
+        moves = []
+        while empty:
+            low = empty & -empty
+            moves.append(low.bit_length() - 1)
+            empty ^= low
+        return moves
+
+    def search(self, board, depth=None, time_budget=None, stats=None):
+        """
+        Returns the best action for the current player, or None if the
+        game is over.
+
+        Alpha-beta searches of increasing depth are run, each trying
+        the previous best move first, up to depth plies (every empty
+        cell by default) or until time_budget seconds have passed, in
+        which case the move of the last finished search is returned.
+        Positions are scored by evaluate() when the depth runs out. If
+        given, stats['nodes'] is increased by the positions searched.
+        """
+        x, o = self.to_bitboard(board)
+        if self.bitboard_terminal(x, o):
+            return None
+        if stats is None:
+            stats = {'nodes': 0}
+        else:
+            stats.setdefault('nodes', 0)
+        maximizing = self.bitboard_player(x, o) == X
+        remaining = (self.full & ~(x | o)).bit_count()
+        maxDepth = remaining if depth is None else min(depth, remaining)
+        deadline = None
+        if time_budget is not None:
+            deadline = time.perf_counter() + time_budget
+
+        moves = self.candidate_moves(x, o)
+        if len(moves) == 1:
+            return divmod(moves[0], self.cols)
+        best = None
+        for plies in range(1, maxDepth + 1):
+            try:
+                score, move = self._alphabeta(
+                    x, o, maximizing, plies, -math.inf, math.inf,
+                    best, None, deadline, stats
+                )
+            except SearchTimeout:
+                break
+            best = move
+            if abs(score) >= WIN:
+                break
+        if best is None:
+            best = moves[0]
+        return divmod(best, self.cols)
+
+    def _alphabeta(self, x, o, maximizing, depth, alpha, beta, first,
+                   last, deadline, stats):
+        """
+        Returns (score, move) for the bitboards, searched depth plies
+        deep within the window (alpha, beta). first is tried before the
+        other moves, and last is the cell just played, the only place a
+        new line can have been completed.
+        """
+        stats['nodes'] += 1
+        if deadline is not None and time.perf_counter() > deadline:
+            raise SearchTimeout()
+        if last is not None:
+            # The player who just moved is the one not to move now
+            if maximizing and self.wins_at(o, last):
+                return -(WIN + depth), None
+            if not maximizing and self.wins_at(x, last):
+                return WIN + depth, None
+        if (x | o) == self.full:
+            return 0, None
+        if depth == 0:
+            return self.evaluate(x, o), None
+
+        moves = self.candidate_moves(x, o)
+        if first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        best = None
+        value = -math.inf if maximizing else math.inf
+        for move in moves:
+            if maximizing:
+                score = self._alphabeta(
+                    x | 1 << move, o, False, depth - 1, alpha, beta,
+                    None, move, deadline, stats
+                )[0]
+                if score > value:
+                    value, best = score, move
+                alpha = max(alpha, value)
+            else:
+                score = self._alphabeta(
+                    x, o | 1 << move, True, depth - 1, alpha, beta,
+                    None, move, deadline, stats
+                )[0]
+                if score < value:
+                    value, best = score, move
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+        return value, best
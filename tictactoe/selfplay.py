@@ -0,0 +1,190 @@
+"""
+Plays tictactoe games without a window, across worker processes.
+
+Usage: python selfplay.py [--games N] [--engine minimax|alphabeta]
+                          [--opponent ai|random|both] [--opening PLIES]
+                          [--workers N] [--seed N] [--output results.json]
+
+The AI plays itself and a random player. Games per second, per-move
+latency of the AI, positions searched and game outcomes are reported
+as JSON.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import tictactoe as ttt
+
+ENGINES = ("minimax", "alphabeta")
+OPPONENTS = ("ai", "random", "both")
+GAMES = 1000
+OPENING = 2
+PERCENTILES = (50, 90, 99)
+# Games handed to a worker at a time
+CHUNK_SIZE = 64
+
+
+def choose_move(kind, board, generator, stats):
+    """
+    Returns the move of a "random" player or of an AI engine on the
+    board. stats['nodes'] is increased by the positions searched.
+    """
+    if kind == "random":
+        return generator.choice(ttt.actions(board))
+    if kind == "minimax":
+        return ttt.minimax(board)
+    if kind == "alphabeta":
+        return ttt.alphabeta(board, stats=stats)
+    raise ValueError(f"Unknown player: {kind}")
+
+
+def play_game(x, o, seed, opening=0):
+    """
+    Plays one game between players x and o, each "random" or one of
+    ENGINES, after `opening` random moves. Returns the utility of the
+    final board, the seconds each AI move took and the positions the
+    AI searched.
+    """
+    generator = random.Random(seed)
+    stats = {'nodes': 0}
+    latencies = []
+    board = ttt.initial_state()
+    plies = 0
+    while not ttt.terminal(board):
+        kind = x if ttt.player(board) == ttt.X else o
+        if plies < opening:
+            kind = "random"
+        if kind == "random":
+            move = choose_move(kind, board, generator, stats)
+        else:
+            started = time.perf_counter()
+            move = choose_move(kind, board, generator, stats)
+            latencies.append(time.perf_counter() - started)
+        board = ttt.result(board, move)
+        plies += 1
+    return ttt.utility(board), latencies, stats['nodes']
+
+
+def _play_game(spec):
+    return play_game(*spec)
+
+
+def schedule(games, engine="minimax", opponent="both", opening=OPENING,
+             seed=0):
+    """
+    Returns the games to play as (matchup, x, o, seed, opening) tuples.
+    Against the random player the AI takes X and O in turn; games
+    between two AIs start with `opening` random moves so they differ.
+    """
+    matchups = []
+    if opponent in ("ai", "both"):
+        matchups.append(("ai", engine, engine, opening))
+    if opponent in ("random", "both"):
+        matchups.append(("ai-x", engine, "random", 0))
+        matchups.append(("random-x", "random", engine, 0))
+    if not matchups:
+        raise ValueError(f"Unknown opponent: {opponent}")
+    specs = []
+    for i in range(games):
+        name, x, o, plies = matchups[i % len(matchups)]
+        specs.append((name, x, o, seed + i, plies))
+    return specs
+
+
+def percentile(values, p):
+    """
+    Returns the nearest-rank p-th percentile of sorted values.
+    """
+    if not values:
+        return None
+    return values[min(len(values) - 1, len(values) * p // 100)]
+
+
+def run_tournament(games, engine="minimax", opponent="both",
+                   opening=OPENING, seed=0, workers=None):
+    """
+    Plays the scheduled games on `workers` processes (one per CPU by
+    default, or in this process if 1) and returns the report.
+    """
+    if games <= 0:
+        raise ValueError("games must be positive")
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    specs = schedule(games, engine, opponent, opening, seed)
+    started = time.perf_counter()
+    if workers == 1:
+        results = [_play_game(spec[1:]) for spec in specs]
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(
+                _play_game, [spec[1:] for spec in specs],
+                chunksize=CHUNK_SIZE
+            ))
+    seconds = time.perf_counter() - started
+
+    outcomes = {}
+    latencies = []
+    nodes = 0
+    for (name, *_), (score, moveTimes, searched) in zip(specs, results):
+        counts = outcomes.setdefault(
+            name, {"games": 0, "x_wins": 0, "o_wins": 0, "draws": 0}
+        )
+        counts["games"] += 1
+        counts[{1: "x_wins", -1: "o_wins", 0: "draws"}[score]] += 1
+        latencies.extend(moveTimes)
+        nodes += searched
+    latencies.sort()
+    latency = {}
+    if latencies:
+        for p in PERCENTILES:
+            latency[f"p{p}"] = percentile(latencies, p) * 1000
+        latency["max"] = latencies[-1] * 1000
+
+    return {
+        "engine": engine,
+        "games": games,
+        "workers": workers or os.cpu_count(),
+        "seconds": seconds,
+        "games_per_second": games / seconds,
+        "ai_moves": len(latencies),
+        "latency_ms": latency,
+        "nodes": nodes,
+        "outcomes": outcomes,
+        # A perfect player never loses to a random one
+        "ai_losses": (outcomes.get("ai-x", {}).get("o_wins", 0)
+                      + outcomes.get("random-x", {}).get("x_wins", 0)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--games", type=int, default=GAMES)
+    parser.add_argument("--engine", choices=ENGINES, default="minimax")
+    parser.add_argument("--opponent", choices=OPPONENTS, default="both")
+    parser.add_argument("--opening", type=int, default=OPENING,
+                        help="random moves that start each AI-vs-AI game")
+    parser.add_argument("--workers", type=int,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON here, not to stdout")
+    args = parser.parse_args()
+
+    report = run_tournament(
+        args.games, args.engine, args.opponent, args.opening, args.seed,
+        args.workers
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+import mnk
+import tictactoe as ttt
+from test_tictactoe import POSITIONS, play, reference_score
+
+X, O, EMPTY = mnk.X, mnk.O, mnk.EMPTY
+
+
+def board_from(rows):
+    return [[{"X": X, "O": O}.get(cell, EMPTY) for cell in row] for row in rows]
+
+
+@pytest.mark.parametrize("board", POSITIONS)
+def test_full_depth_search_is_perfect_on_3x3(board):
+    move = ttt.GAME.search(board)
+    assert reference_score(play(board, move)) == reference_score(board)
+
+
+def test_lines_of_3x3_game():
+    assert len(ttt.GAME.lines) == 8
+    assert len(mnk.MNKGame(4, 4, 3).lines) == 24
+    assert len(mnk.MNKGame(15, 15, 5).lines) == 2 * 11 * 15 + 2 * 11 * 11
+
+
+def test_winner_on_rectangular_board():
+    game = mnk.MNKGame(4, 5, 4)
+    board = board_from([
+        ".....",
+        ".O...",
+        "..O..",
+        "...O.",
+    ])
+    assert game.winner(board) is None
+    board[0][0] = O
+    assert game.winner(board) == O
+    assert game.terminal(board)
+
+
+def test_takes_a_win_and_blocks_a_loss_on_4x4():
+    game = mnk.MNKGame(4, 4, 4)
+    board = board_from([
+        "XXX.",
+        "OO..",
+        "O...",
+        "....",
+    ])
+    assert game.search(board, depth=2) == (0, 3)
+    board = board_from([
+        "XX..",
+        "OOO.",
+        "X...",
+        "....",
+    ])
+    assert game.search(board, depth=2) == (1, 3)
+
+
+def test_gomoku_search_respects_time_budget():
+    game = mnk.MNKGame(15, 15, 5)
+    board = game.initial_state()
+    board[7][7] = X
+    board[7][8] = O
+    started = time.perf_counter()
+    move = game.search(board, time_budget=0.2)
+    assert time.perf_counter() - started < 1
+    assert board[move[0]][move[1]] == EMPTY
+
+
+def test_result_rejects_taken_cells():
+    game = mnk.MNKGame(3, 4, 3)
+    board = game.result(game.initial_state(), (0, 3))
+    assert board[0][3] == X
+    with pytest.raises(ValueError):
+        game.result(board, (0, 3))
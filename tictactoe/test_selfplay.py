@@ -0,0 +1,41 @@
+import pytest
+
+import selfplay
+
+
+@pytest.mark.parametrize("engine", selfplay.ENGINES)
+def test_ai_never_loses_to_random_player(engine):
+    for seed in range(20):
+        score, latencies, _ = selfplay.play_game(engine, "random", seed)
+        assert score >= 0
+        assert 3 <= len(latencies) <= 5
+        score, _, _ = selfplay.play_game("random", engine, seed)
+        assert score <= 0
+
+
+def test_ai_draws_itself_from_the_empty_board():
+    score, latencies, nodes = selfplay.play_game("alphabeta", "alphabeta", 0)
+    assert score == 0
+    assert len(latencies) == 9
+    assert nodes > 0
+
+
+def test_tournament_report_counts_every_game():
+    report = selfplay.run_tournament(30, "alphabeta", workers=2)
+    assert sum(counts["games"] for counts in report["outcomes"].values()) == 30
+    assert set(report["outcomes"]) == {"ai", "ai-x", "random-x"}
+    assert report["ai_losses"] == 0
+    assert report["ai_moves"] > 0
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["max"]
+    assert report["nodes"] > 0
+
+
+def test_tournament_is_reproducible():
+    first = selfplay.run_tournament(12, "minimax", seed=3, workers=1)
+    second = selfplay.run_tournament(12, "minimax", seed=3, workers=2)
+    assert first["outcomes"] == second["outcomes"]
+
+
+def test_tournament_rejects_unknown_engine():
+    with pytest.raises(ValueError):
+        selfplay.run_tournament(1, "random")
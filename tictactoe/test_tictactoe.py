@@ -0,0 +1,130 @@
+import pytest
+
+import tictactoe as ttt
+
+X, O, EMPTY = ttt.X, ttt.O, ttt.EMPTY
+
+
+def reference_score(board, counter=None):
+    """Plain minimax value of `board`, without caching or pruning."""
+    if counter is not None:
+        counter['nodes'] += 1
+    if ttt.terminal(board):
+        return ttt.utility(board)
+    scores = []
+    for move in ttt.actions(board):
+        child = [row[:] for row in board]
+        child[move[0]][move[1]] = ttt.player(board)
+        scores.append(reference_score(child, counter))
+    return max(scores) if ttt.player(board) == X else min(scores)
+
+
+def play(board, move):
+    child = [row[:] for row in board]
+    child[move[0]][move[1]] = ttt.player(board)
+    return child
+
+
+POSITIONS = [
+    [[X, EMPTY, EMPTY], [EMPTY, EMPTY, EMPTY], [EMPTY, EMPTY, EMPTY]],
+    [[X, O, EMPTY], [EMPTY, EMPTY, EMPTY], [EMPTY, EMPTY, EMPTY]],
+    [[X, EMPTY, EMPTY], [EMPTY, O, EMPTY], [EMPTY, EMPTY, X]],
+    [[O, X, X], [EMPTY, X, EMPTY], [EMPTY, O, EMPTY]],
+    [[X, X, EMPTY], [O, O, EMPTY], [EMPTY, EMPTY, EMPTY]],
+]
+
+
+@pytest.mark.parametrize("board", POSITIONS)
+def test_minimax_plays_a_best_move(board):
+    move = ttt.minimax([row[:] for row in board])
+    assert move in ttt.actions(board)
+    assert reference_score(play(board, move)) == reference_score(board)
+
+
+def test_minimax_leaves_board_untouched():
+    board = [row[:] for row in POSITIONS[2]]
+    ttt.minimax(board)
+    assert board == POSITIONS[2]
+
+
+def test_transpositions_are_reused():
+    ttt.clear_transpositions()
+    ttt.realMinimax(POSITIONS[0], False)
+    cached = len(ttt.transpositions)
+    assert cached > 0
+    ttt.realMinimax(POSITIONS[1], True)
+    assert len(ttt.transpositions) == cached
+
+
+@pytest.mark.parametrize("board", POSITIONS + [ttt.initial_state()])
+def test_bitboard_functions_match_list_board(board):
+    x, o = ttt.to_bitboard(board)
+    assert ttt.from_bitboard(x, o) == board
+    assert ttt.bitboard_player(x, o) == ttt.player(board)
+    assert [divmod(m, 3) for m in ttt.bitboard_actions(x, o)] == (
+        ttt.actions(board)
+    )
+    assert ttt.bitboard_winner(x, o) == ttt.winner(board)
+    assert ttt.bitboard_terminal(x, o) == ttt.terminal(board)
+    assert ttt.bitboard_utility(x, o) == ttt.utility(board)
+
+
+@pytest.mark.parametrize("board", POSITIONS)
+def test_alphabeta_row_major_returns_minimax_move(board):
+    assert ttt.alphabeta(board, "row-major") == ttt.minimax(
+        [row[:] for row in board]
+    )
+
+
+@pytest.mark.parametrize("ordering", list(ttt.ORDERINGS))
+@pytest.mark.parametrize("board", POSITIONS)
+def test_alphabeta_plays_a_best_move(board, ordering):
+    move = ttt.alphabeta(board, ordering)
+    assert reference_score(play(board, move)) == reference_score(board)
+
+
+@pytest.mark.parametrize("ordering", list(ttt.ORDERINGS))
+def test_alphabeta_searches_fewer_nodes(ordering):
+    board = POSITIONS[0]
+    exhaustive = {'nodes': 0}
+    reference_score(board, exhaustive)
+    pruned = {'nodes': 0}
+    ttt.alphabeta(board, ordering, pruned)
+    assert pruned['nodes'] < exhaustive['nodes'] / 5
+
+
+def value(x, o):
+    return ttt.bitboardMinimax(x, o, ttt.bitboard_player(x, o) == X)[0]
+
+
+def test_book_move_is_optimal_in_every_reachable_position(tmp_path):
+    path = tmp_path / "book.bin"
+    assert ttt.generate_book(path) == 627
+    assert ttt.load_book(path) == ttt.book
+
+    frontier = [(0, 0)]
+    seen = set()
+    while frontier:
+        x, o = frontier.pop()
+        if (x, o) in seen or ttt.bitboard_terminal(x, o):
+            continue
+        seen.add((x, o))
+        i, j = ttt.book_move(ttt.from_bitboard(x, o))
+        move = 3 * i + j
+        assert not (x | o) >> move & 1
+        if ttt.bitboard_player(x, o) == X:
+            child = (x | 1 << move, o)
+            frontier.extend((x | 1 << m, o) for m in ttt.bitboard_actions(x, o))
+        else:
+            child = (x, o | 1 << move)
+            frontier.extend((x, o | 1 << m) for m in ttt.bitboard_actions(x, o))
+        assert value(*child) == value(x, o)
+
+
+def test_missing_book_falls_back_to_search(tmp_path, monkeypatch):
+    assert ttt.load_book(tmp_path / "missing.bin") == {}
+    monkeypatch.setattr(ttt, "book", {})
+    monkeypatch.setattr(ttt, "book_move", None)
+    for board in [ttt.initial_state()] + POSITIONS:
+        move = ttt.minimax([row[:] for row in board])
+        assert reference_score(play(board, move)) == reference_score(board)
@@ -5,36 +5,66 @@ Tic Tac Toe Player
 
 import math
 import copy
+import os
+import struct
 
-X = "X"
-O = "O"
-EMPTY = None
+import mnk
+
+X = mnk.X
+O = mnk.O
+EMPTY = mnk.EMPTY
 human = None
 
+# Tic Tac Toe is the 3 x 3, three in a row special case of an m,n,k-game
+GAME = mnk.MNKGame(3, 3, 3)
+
+# Scores and best moves of every position searched so far, keyed by
+# encode(board). Kept across calls and games; see clear_transpositions().
+transpositions = {}
+
+# Bitboards: bit 3 * i + j of a 9-bit mask is cell (i, j)
+FULL = GAME.full
+LINES = GAME.lines
+
+# Cell orders tried by alphabeta; "history" orders by past cutoffs instead
+ORDERINGS = {
+    "row-major": (0, 1, 2, 3, 4, 5, 6, 7, 8),
+    "center": (4, 0, 2, 6, 8, 1, 3, 5, 7),
+    "corners": (0, 2, 6, 8, 4, 1, 3, 5, 7),
+    "edges": (1, 3, 5, 7, 4, 0, 2, 6, 8),
+    "history": None,
+}
+
+# The 8 symmetries of the board. Cell k of a transformed board is cell
+# SYMMETRIES[s][k] of the original.
+SYMMETRIES = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8),  # identity
+    (6, 3, 0, 7, 4, 1, 8, 5, 2),  # rotate 90
+    (8, 7, 6, 5, 4, 3, 2, 1, 0),  # rotate 180
+    (2, 5, 8, 1, 4, 7, 0, 3, 6),  # rotate 270
+    (2, 1, 0, 5, 4, 3, 8, 7, 6),  # mirror left-right
+    (6, 7, 8, 3, 4, 5, 0, 1, 2),  # mirror top-bottom
+    (0, 3, 6, 1, 4, 7, 2, 5, 8),  # main diagonal
+    (8, 5, 2, 7, 4, 1, 6, 3, 0),  # anti-diagonal
+)
+
+# Perfect-play opening book written by book.py: one little-endian uint32
+# per canonical position, the position key shifted left by 4 bits plus
+# the best cell to play.
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+BOOK_ENTRY = struct.Struct("<I")
+
+
 def initial_state():
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return GAME.initial_state()
 
 
 def player(board):
-    num = 0
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] == EMPTY:
-                num += 1
-    if num % 2 != 0:
-        return "X"
-    return "O"
+    return GAME.player(board)
 
 
 def actions(board):
-    action = []
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] == EMPTY:
-                action.append((i,j))
-    return action
+    return GAME.actions(board)
 
 
 def result(board, action):
@@ -46,17 +76,7 @@ def result(board, action):
 
 
 def winner(board):
-    for i in range(3):
-        if board[i][0] == board[i][1] == board[i][2] != None:
-            return board[i][0]
-    for i in range(3):
-        if board[0][i] == board[1][i] == board[2][i] != None:
-            return board[0][i]
-    if board[0][0] == board[1][1] == board[2][2] != None:
-        return board[0][0]
-    if board[0][2] == board[1][1] == board[2][0] != None:
-        return board[0][2]
-    return None
+    return GAME.winner(board)
 
 def terminal(board):
     if len(actions(board)) == 0:
@@ -75,6 +95,76 @@ def utility(board):
     else:
         return 0
 
+def encode(board):
+    """
+    Returns the board as one integer: the X bitboard in the low 9 bits
+    and the O bitboard in the 9 bits above.
+    """
+    x, o = to_bitboard(board)
+    return x | o << 9
+
+
+def to_bitboard(board):
+    """
+    Returns the (X, O) bitboards of a list board.
+    """
+    return GAME.to_bitboard(board)
+
+
+def from_bitboard(x, o):
+    """
+    Returns the list board of the (X, O) bitboards.
+    """
+    return GAME.from_bitboard(x, o)
+
+
+def bitboard_player(x, o):
+    """
+    Returns the player who has the next turn on the bitboards.
+    """
+    return GAME.bitboard_player(x, o)
+
+
+def bitboard_actions(x, o):
+    """
+    Returns the indices of the empty cells, in row-major order.
+    """
+    return GAME.candidate_moves(x, o)
+
+
+def bitboard_winner(x, o):
+    """
+    Returns the winner on the bitboards, if there is one.
+    """
+    return GAME.bitboard_winner(x, o)
+
+
+def bitboard_terminal(x, o):
+    """
+    Returns True if the game on the bitboards is over.
+    """
+    return GAME.bitboard_terminal(x, o)
+
+
+def bitboard_utility(x, o):
+    """
+    Returns 1 if X has won, -1 if O has won, 0 otherwise.
+    """
+    for line in LINES:
+        if x & line == line:
+            return 1
+        if o & line == line:
+            return -1
+    return 0
+
+
+def clear_transpositions():
+    """
+    Forgets every position cached by realMinimax.
+    """
+    transpositions.clear()
+
+
 def undoMove(board,move):
     i = move[0]
     j = move[1]
@@ -82,6 +172,8 @@ def undoMove(board,move):
 
 def minimax(board):
     if not terminal(board):
+        if book:
+            return book_move(board)
         if len(actions(board)) == 9:
             return actions(board)[0]
         isMax = False
@@ -90,24 +182,169 @@ def minimax(board):
         retVal = realMinimax(board,isMax)
         return retVal['move']
 
-def realMinimax(board,maximizingPlayer):
-    if winner(board):
-        return {'score':utility(board)}
-    elif len(actions(board)) == 0:
-        return {'score': 0}
-    if maximizingPlayer:
-        best = {'move':None,'score':-math.inf}
+def realMinimax(board,maximizingPlayer,stats=None):
+    x, o = to_bitboard(board)
+    score, move = bitboardMinimax(x,o,maximizingPlayer,stats)
+    if move is None:
+        return {'score':score}
+    return {'score':score,'move':divmod(move,3)}
+
+def bitboardMinimax(x,o,maximizingPlayer,stats=None):
+    """
+    Returns (score, move) for the bitboards, where move is the index of
+    the best cell to play, or None if the game is over. If given,
+    stats['nodes'] is increased by the number of positions searched.
+    """
+    if stats is not None:
+        stats['nodes'] += 1
+    key = x | o << 9
+    if key in transpositions:
+        return transpositions[key]
+    score = bitboard_utility(x,o)
+    if score or (x | o) == FULL:
+        best = (score,None)
+    elif maximizingPlayer:
+        best = (-math.inf,None)
+        for move in bitboard_actions(x,o):
+            score = bitboardMinimax(x | 1 << move,o,False,stats)[0]
+            if score > best[0]:
+                best = (score,move)
+    else:
+        best = (math.inf,None)
+        for move in bitboard_actions(x,o):
+            score = bitboardMinimax(x,o | 1 << move,True,stats)[0]
+            if score < best[0]:
+                best = (score,move)
+    transpositions[key] = best
+    return best
+
+def alphabeta(board,ordering="center",stats=None):
+    """
+    Returns the optimal action for the current player on the board,
+    found by alpha-beta search trying cells in the given ordering.
+
+    ordering is a key of ORDERINGS. With "row-major" the move is the
+    same one minimax returns; other orderings return a move of the same
+    value. If given, stats['nodes'] is increased by the number of
+    positions searched. The board is not modified.
+    """
+    if terminal(board):
+        return None
+    if ordering not in ORDERINGS:
+        raise ValueError(f"Unknown move ordering: {ordering}")
+    x, o = to_bitboard(board)
+    if stats is None:
+        stats = {'nodes':0}
     else:
-        best = {'move':None,'score':math.inf}
-    for move in actions(board):
-        board = result(board,move)
-        temporaryScore = realMinimax(board,not maximizingPlayer)
-        undoMove(board,move)
-        temporaryScore['move'] = move
+        stats.setdefault('nodes',0)
+    history = [0] * 9
+    maximizing = bitboard_player(x,o) == X
+    move = bitboardAlphabeta(x,o,maximizing,-2,2,
+                             ORDERINGS[ordering],history,stats)[1]
+    return divmod(move,3)
+
+def bitboardAlphabeta(x,o,maximizingPlayer,alpha,beta,order,history,stats):
+    """
+    Returns (score, move) for the bitboards by alpha-beta search within
+    the window (alpha, beta). order is a tuple of cell indices, or None
+    to order moves by the history table of cutoffs.
+    """
+    stats['nodes'] += 1
+    score = bitboard_utility(x,o)
+    taken = x | o
+    if score or taken == FULL:
+        return score, None
+    if order is None:
+        moves = sorted(bitboard_actions(x,o),key=history.__getitem__,reverse=True)
+    else:
+        moves = [move for move in order if not taken >> move & 1]
+    best = None
+    value = -2 if maximizingPlayer else 2
+    for move in moves:
         if maximizingPlayer:
-            if temporaryScore['score'] > best['score']:
-                best = temporaryScore
+            score = bitboardAlphabeta(x | 1 << move,o,False,
+                                      alpha,beta,order,history,stats)[0]
+            if score > value:
+                value, best = score, move
+            alpha = max(alpha,value)
         else:
-            if temporaryScore['score'] < best['score']:
-                best = temporaryScore
-    return best
+            score = bitboardAlphabeta(x,o | 1 << move,True,
+                                      alpha,beta,order,history,stats)[0]
+            if score < value:
+                value, best = score, move
+            beta = min(beta,value)
+        if alpha >= beta:
+            history[move] += 1 << (FULL & ~taken).bit_count()
+            break
+    return value, best
+
+def transform(mask,symmetry):
+    """
+    Returns the bitboard mask seen through one of the SYMMETRIES.
+    """
+    result = 0
+    for cell, source in enumerate(symmetry):
+        if mask >> source & 1:
+            result |= 1 << cell
+    return result
+
+def canonical(x,o):
+    """
+    Returns (key, symmetry) for the smallest position key, X mask plus
+    O mask shifted by 9, among the 8 symmetric images of the bitboards.
+    """
+    return min(
+        (transform(x,symmetry) | transform(o,symmetry) << 9, symmetry)
+        for symmetry in SYMMETRIES
+    )
+
+def generate_book(path=BOOK_PATH):
+    """
+    Solves every reachable unfinished position once per symmetry class
+    and writes the best move of each to path. Returns the number of
+    positions written.
+    """
+    entries = {}
+    frontier = [(0,0)]
+    seen = set()
+    while frontier:
+        x, o = frontier.pop()
+        key, symmetry = canonical(x,o)
+        if key in seen or bitboard_terminal(x,o):
+            continue
+        seen.add(key)
+        cx, co = key & FULL, key >> 9
+        maximizing = bitboard_player(cx,co) == X
+        entries[key] = bitboardMinimax(cx,co,maximizing)[1]
+        for move in bitboard_actions(x,o):
+            if maximizing:
+                frontier.append((x | 1 << move,o))
+            else:
+                frontier.append((x,o | 1 << move))
+    with open(path,"wb") as f:
+        for key in sorted(entries):
+            f.write(BOOK_ENTRY.pack(key << 4 | entries[key]))
+    return len(entries)
+
+def load_book(path=BOOK_PATH):
+    """
+    Returns the opening book at path as a dict from canonical position
+    key to best cell, or an empty dict if there is no book.
+    """
+    try:
+        with open(path,"rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return {}
+    return {entry >> 4: entry & 15 for (entry,) in BOOK_ENTRY.iter_unpack(data)}
+
+def book_move(board):
+    """
+    Returns the opening book's move for the board.
+    """
+    x, o = to_bitboard(board)
+    key, symmetry = canonical(x,o)
+    return divmod(symmetry[book[key]],3)
+
+
+book = load_book()